@@ -6,13 +6,28 @@ Formula used for Beta:
 Beta = Covariance(Stock Returns, Index Returns) / Variance(Index Returns)
 """
 
+import os
+import re
+import hashlib
 import yfinance as yf
 import pandas as pd
-from datetime import datetime
+import numpy as np
+from numba import njit
+from datetime import date
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'beta_calc')
+# Bump whenever the layout of the pickled frames changes so stale files are ignored
+CACHE_VERSION = 2
+# Longest run of missing sessions bridged when aligning calendars (e.g. a week-long holiday);
+# longer gaps are treated as halts or delistings and left out of the beta
+MAX_FILL_SESSIONS = 5
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
 
 def valid_date(date_string):
+    if not _DATE_RE.match(date_string):
+        return False
     try:
-        datetime.strptime(date_string, '%Y-%m-%d')
+        date.fromisoformat(date_string)
         return True
     except ValueError:
         return False
@@ -35,49 +50,118 @@ def get_valid_share(prompt):
             print("Invalid input. Please enter a number greater than 0.")
 
 
-def get_stock_data(tickers, start_date, end_date):
-    data = yf.download(tickers, start=start_date, end=end_date)['Adj Close']
+def _download_closes(tickers, **window):
+    # Only adjusted closes are used, stored as float32 to halve the frame size
+    data = yf.download(list(tickers), actions=False, auto_adjust=True, threads=True, progress=False,
+                       **window)['Close'].astype('float32')
     if isinstance(data, pd.Series):
-        data = pd.DataFrame(data, columns=[tickers])
+        data = data.to_frame(name=tickers[0])
     return data
 
 
-def calculate_individual_beta(stock_data, index_data):
-    combined_data = pd.concat([stock_data, index_data], axis=1)
-    combined_data = combined_data.dropna()
-    returns = combined_data.pct_change().dropna()
-    covariance = returns.cov().iloc[0, 1]
-    variance = returns.iloc[:, 1].var()
-    beta = covariance / variance
-    return beta
+def _cache_file(tickers, start_date, end_date):
+    cache_key = hashlib.sha1(repr((CACHE_VERSION, tickers, start_date, end_date)).encode()).hexdigest()
+    return os.path.join(CACHE_DIR, cache_key + '.pkl')
+
 
+def _save_to_cache(data, cache_file):
+    # yfinance reports a failed ticker as an all-NaN column instead of raising, so never persist those
+    if data.empty or not data.notna().any().all() or getattr(yf.shared, '_ERRORS', None):
+        return
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write then rename so an interrupted run cannot leave a truncated pickle behind
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    data.to_pickle(tmp_file)
+    os.replace(tmp_file, cache_file)
 
-def calculate_portfolio_beta(stock_tickers, stock_weights, start_date, end_date, index_ticker):
-    stock_data = get_stock_data(stock_tickers + [index_ticker], start_date, end_date)
-    index_data = stock_data[index_ticker]
-    portfolio_beta = 0
 
+def get_current_prices(tickers):
+    # A few sessions back so tickers that did not trade on the last day still get a price
+    return _download_closes(tickers, period='5d').ffill().iloc[-1]
+
+
+def fetch_all(tickers, index_ticker, start_date, end_date):
+    # Repeated tickers (or an index that is also a holding) share one column
+    unique_tickers = tuple(dict.fromkeys(tickers + [index_ticker]))
+    cache_file = _cache_file(unique_tickers, start_date, end_date)
+    if os.path.exists(cache_file):
+        stock_data = pd.read_pickle(cache_file)
+        # Weights (and so current prices) are only needed for more than one holding
+        current_prices = get_current_prices(tuple(dict.fromkeys(tickers))) if len(tickers) > 1 else None
+        return stock_data, current_prices
+
+    # One download covers both the beta lookback and the latest prices used for weights
+    data = _download_closes(unique_tickers, start=start_date)
+    stock_data = data[data.index < end_date]
+    current_prices = data.ffill().iloc[-1]
+
+    # Ranges ending before today are complete, so they are kept on disk between runs
+    if end_date < date.today().isoformat():
+        _save_to_cache(stock_data, cache_file)
+    return stock_data, current_prices
+
+
+@njit('f8(f8[:], f8[:])', cache=True, error_model='numpy')
+def _beta_kernel(stock_prices, index_prices):
+    # Single pass over prices: returns, means and co-moments via Welford's online algorithm
+    n = 0
+    mean_s = 0.0
+    mean_i = 0.0
+    m2_i = 0.0
+    c = 0.0
+    for k in range(1, stock_prices.shape[0]):
+        rs = stock_prices[k] / stock_prices[k - 1] - 1.0
+        ri = index_prices[k] / index_prices[k - 1] - 1.0
+        n += 1
+        delta_s = rs - mean_s
+        mean_s += delta_s / n
+        delta_i = ri - mean_i
+        mean_i += delta_i / n
+        m2_i += (ri - mean_i) * delta_i
+        c += (rs - mean_s) * delta_i
+    if m2_i == 0.0:
+        # Fewer than two returns or a flat index: beta is undefined
+        return np.nan
+    return c / m2_i
+
+
+def calculate_individual_beta(stock_prices, index_prices):
+    # Gaps left after forward-filling: before a stock listed, or halts/delistings beyond MAX_FILL_SESSIONS
+    valid = np.isfinite(stock_prices) & np.isfinite(index_prices)
+    if valid.all():
+        # Usual case after alignment: hand the contiguous column views straight to the kernel
+        return _beta_kernel(stock_prices, index_prices)
+    if valid.sum() < 2:
+        # No overlapping history, e.g. an invalid or delisted ticker
+        return np.nan
+    return _beta_kernel(stock_prices[valid], index_prices[valid])
+
+
+def calculate_portfolio_beta(stock_data, stock_tickers, stock_weights, index_ticker):
+    # Align on the index's trading calendar, carrying prices over the stocks' own market holidays
+    stock_data = stock_data.reindex(stock_data[index_ticker].dropna().index).ffill(limit=MAX_FILL_SESSIONS)
+
+    # Column-major so each ticker's price history is a contiguous slice
+    prices = np.asfortranarray(stock_data.to_numpy(dtype=np.float64))
+    index_prices = prices[:, stock_data.columns.get_loc(index_ticker)]
+
+    betas = np.empty(len(stock_tickers))
     for i, ticker in enumerate(stock_tickers):
-        individual_stock_data = stock_data[ticker]
-        beta = calculate_individual_beta(individual_stock_data, index_data)
-        weighted_beta = beta * stock_weights[i]
-        portfolio_beta += weighted_beta
+        if ticker == index_ticker:
+            betas[i] = 1.0
+        else:
+            betas[i] = calculate_individual_beta(prices[:, stock_data.columns.get_loc(ticker)], index_prices)
 
+    portfolio_beta = float(betas @ np.asarray(stock_weights))
     return portfolio_beta
 
 
-def get_current_prices(tickers):
-    data = yf.download(tickers, period='1d')['Adj Close'].iloc[-1]
-    return data
-
-
-def calculate_portfolio_weights(tickers, shares):
+def calculate_portfolio_weights(tickers, shares, current_prices):
     if len(tickers) == 1:
         return [1.0]
     else:
-        current_prices = get_current_prices(tickers)
-        total_value = sum(current_prices[ticker] * shares[i] for i, ticker in enumerate(tickers))
-        weights = [(current_prices[ticker] * shares[i]) / total_value for i, ticker in enumerate(tickers)]
+        values = current_prices.reindex(tickers).to_numpy() * np.asarray(shares)
+        weights = (values / values.sum()).tolist()
         return weights
 
 
@@ -122,8 +206,14 @@ def main():
             tickers.append(ticker)
             shares.append(share)
 
-        weights = calculate_portfolio_weights(tickers, shares)
-        portfolio_beta = calculate_portfolio_beta(tickers, weights, start_date, end_date, index_ticker)
+        # The index measured against itself always has a beta of 1, no data needed
+        if len(tickers) == 1 and tickers[0] == index_ticker:
+            print(f"\nBeta of {tickers[0]} (compared to {index_ticker}): 1.0")
+            return
+
+        stock_data, current_prices = fetch_all(tickers, index_ticker, start_date, end_date)
+        weights = calculate_portfolio_weights(tickers, shares, current_prices)
+        portfolio_beta = calculate_portfolio_beta(stock_data, tickers, weights, index_ticker)
 
         if len(tickers) == 1:
             print(f"\nBeta of {tickers[0]} (compared to {index_ticker}): {portfolio_beta}")